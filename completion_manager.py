@@ -1,7 +1,141 @@
 from config_loader import config
+import asyncio
+import importlib
 import re
 from utils import maintain_token_limit
 
+# Matches the end of a sentence: . ! or ? followed by whitespace or the end of the buffer
+_SENTENCE_END_RE = re.compile(r'[.!?](?:\s|$)')
+
+# Token limit for the conversation history, read once when the module is loaded
+_MAX_TOKENS = config.MAX_TOKENS
+
+# Consumed characters kept at the front of the stream buffer before it is compacted
+_BUFFER_COMPACT_THRESHOLD = 64 * 1024
+
+# COMPLETIONS_API value -> (module, class) of the client; imported lazily so only
+# the configured provider's dependencies need to be installed
+_CLIENT_REGISTRY = {
+    "openai": ("llm_apis.openai_client", "OpenAIClient"),
+    "together": ("llm_apis.togetherai_client", "TogetherAIClient"),
+    "anthropic": ("llm_apis.anthropic_client", "AnthropicClient"),
+    "perplexity": ("llm_apis.perplexity_client", "PerplexityClient"),
+    "openrouter": ("llm_apis.openrouter_client", "OpenRouterClient"),
+    "groq": ("llm_apis.groq_client", "GroqClient"),
+    "tabbyapi": ("llm_apis.tabbyapi_client", "TabbyApiClient"),
+    "google": ("llm_apis.gemini_client", "GeminiClient"),
+    "portkey": ("llm_apis.portkey_client", "PortkeyClient"),
+    "portkey_prompt": ("llm_apis.portkey_prompt_client", "PortkeyPromptClient"),
+    "lm_studio": ("llm_apis.lm_studio_client", "LM_StudioClient"),
+    "ollama": ("llm_apis.ollama_client", "OllamaClient"),
+}
+
+# Config settings passed as base_url to clients of locally hosted servers
+_CLIENT_BASE_URL_SETTINGS = {
+    "lm_studio": "LM_STUDIO_API_BASE_URL",
+    "ollama": "OLLAMA_API_BASE_URL",
+}
+
+# Clients already constructed, keyed by (api, lm studio url, ollama url, verbose)
+_CLIENT_CACHE = {}
+
+def _text_stream_processor(sentence_callback=None, marker_tuples=None, return_full_text=True):
+    """
+    Generator that does the work of CompletionManager.process_text_stream. Chunks of text are
+    passed in with send(), and sending None flushes the remaining buffer and finishes the generator,
+    whose return value is the full input text (or None if return_full_text is False). This lets the same loop serve sync and async streams.
+    """
+    full_text_parts = []
+    buffer = ""
+    buf_pos = 0  # Offset of the first unprocessed character in buffer
+    scan_pos = 0  # No sentence end exists in buffer before this offset
+    active_marker = None  # (end marker, end marker length, callback) of the open marker
+    sentence_end_pattern = _SENTENCE_END_RE
+
+    if marker_tuples:
+        # One alternation finds the earliest start marker in a single scan of the buffer
+        start_pattern = re.compile("|".join(re.escape(start) for start, _, _ in marker_tuples))
+        # start marker -> (end marker, end marker length, callback)
+        markers_by_start = {}
+        for start, end, callback in marker_tuples:
+            markers_by_start.setdefault(start, (end, len(end), callback))
+
+    while True:
+        chunk = yield
+        if chunk is None:
+            break
+        if return_full_text:
+            full_text_parts.append(chunk)
+        # Drop consumed text only occasionally rather than copying after every sentence
+        if buf_pos > _BUFFER_COMPACT_THRESHOLD:
+            buffer = buffer[buf_pos:]
+            scan_pos = max(scan_pos - buf_pos, 0)
+            buf_pos = 0
+        buffer += chunk
+        buffer_len = len(buffer)
+
+        while buf_pos < buffer_len:
+            if active_marker:
+                # Look for the end of the open marker and pass the marked text to its callback
+                end, end_len, callback = active_marker
+                end_index = buffer.find(end, buf_pos)
+                if end_index < 0:
+                    break
+                marked_text = buffer[buf_pos:end_index]
+                if not marked_text.strip():
+                    break
+                if callback:
+                    callback(marked_text)
+                buf_pos = end_index + end_len
+                active_marker = None
+                continue
+
+            if marker_tuples:
+                start_match = start_pattern.search(buffer, buf_pos)
+                if start_match:
+                    buf_pos = start_match.end()
+                    active_marker = markers_by_start[start_match.group()]
+                    continue
+
+            # Resume scanning where the last unsuccessful scan stopped, so an unfinished
+            # sentence is not re-scanned from its start every time a chunk arrives
+            end_match = sentence_end_pattern.search(buffer, max(buf_pos, scan_pos))
+            if end_match:
+                sentence_end = end_match.end()
+            elif buffer.startswith('\n', buf_pos):
+                sentence_end = buf_pos + 1
+            else:
+                scan_pos = buffer_len
+                break
+            sentence = buffer[buf_pos:sentence_end].strip()
+            if sentence_callback and sentence:
+                sentence_callback(sentence)
+            buf_pos = sentence_end
+
+    # Process any remaining buffer, including the text of a marker that was never closed
+    remaining = buffer[buf_pos:].strip()
+    if sentence_callback and remaining:
+        sentence_callback(remaining)
+
+    return "".join(full_text_parts) if return_full_text else None
+
+def _finish_text_stream_processor(processor):
+    """Flush a _text_stream_processor and return the full text it was sent."""
+    try:
+        processor.send(None)
+    except StopIteration as stop:
+        return stop.value
+
+async def _iterate_in_thread(iterable):
+    """Iterate a blocking iterable from async code, fetching each item in a worker thread."""
+    iterator = iter(iterable)
+    sentinel = object()
+    while True:
+        item = await asyncio.to_thread(next, iterator, sentinel)
+        if item is sentinel:
+            return
+        yield item
+
 class CompletionManager:
     def __init__(self, verbose=False):
         """Initialize the CompletionManager with the TTS client."""
@@ -11,66 +145,46 @@ class CompletionManager:
         self._setup_client()
 
     def _setup_client(self):
-        """Instantiates the appropriate AI client based on configuration file."""
-        if config.COMPLETIONS_API == "openai":
-            from llm_apis.openai_client import OpenAIClient
-            self.client = OpenAIClient(verbose=self.verbose)
-            
-        elif config.COMPLETIONS_API == "together":
-            from llm_apis.togetherai_client import TogetherAIClient
-            self.client = TogetherAIClient(verbose=self.verbose)
-
-        elif config.COMPLETIONS_API == "anthropic":
-            from llm_apis.anthropic_client import AnthropicClient
-            self.client = AnthropicClient(verbose=self.verbose)
+        """Instantiates the appropriate AI client based on configuration file.
 
-        elif config.COMPLETIONS_API == "perplexity":
-            from llm_apis.perplexity_client import PerplexityClient
-            self.client = PerplexityClient(verbose=self.verbose)
-
-        elif config.COMPLETIONS_API == "openrouter":
-            from llm_apis.openrouter_client import OpenRouterClient
-            self.client = OpenRouterClient(verbose=self.verbose)
-        
-        elif config.COMPLETIONS_API == "groq":
-            from llm_apis.groq_client import GroqClient
-            self.client = GroqClient(verbose=self.verbose)
+        Clients are shared between CompletionManager instances with the same settings,
+        so their underlying HTTP connections are reused instead of re-established.
+        """
+        if config.COMPLETIONS_API not in _CLIENT_REGISTRY:
+            raise ValueError("Unsupported completion API service configured")
 
-        elif config.COMPLETIONS_API == "tabbyapi":
-            from llm_apis.tabbyapi_client import TabbyApiClient
-            self.client = TabbyApiClient(verbose=self.verbose)
+        cache_key = (
+            config.COMPLETIONS_API,
+            getattr(config, 'LM_STUDIO_API_BASE_URL', None),
+            getattr(config, 'OLLAMA_API_BASE_URL', None),
+            self.verbose,
+        )
+        if cache_key in _CLIENT_CACHE:
+            self.client = _CLIENT_CACHE[cache_key]
+            return
 
-        elif config.COMPLETIONS_API == "google":
-            from llm_apis.gemini_client import GeminiClient
-            self.client = GeminiClient(verbose=self.verbose)
+        module_name, class_name = _CLIENT_REGISTRY[config.COMPLETIONS_API]
+        client_class = getattr(importlib.import_module(module_name), class_name)
 
-        elif config.COMPLETIONS_API == "portkey":
-            from llm_apis.portkey_client import PortkeyClient
-            self.client = PortkeyClient(verbose=self.verbose)
-        
-        elif config.COMPLETIONS_API == "portkey_prompt":
-            from llm_apis.portkey_prompt_client import PortkeyPromptClient
-            self.client = PortkeyPromptClient(verbose=self.verbose) 
-        
-        elif config.COMPLETIONS_API == "lm_studio":
-            from llm_apis.lm_studio_client import LM_StudioClient
-            if hasattr(config, 'LM_STUDIO_API_BASE_URL'):
-                self.client = LM_StudioClient(base_url=config.LM_STUDIO_API_BASE_URL, verbose=self.verbose)
-            else:
-                print("No LM_STUDIO_API_BASE_URL found in config.py, using default")
-                self.client = LM_StudioClient(verbose=self.verbose)
-
-        elif config.COMPLETIONS_API == "ollama":
-            from llm_apis.ollama_client import OllamaClient
-            if hasattr(config, 'OLLAMA_API_BASE_URL'):
-                self.client = OllamaClient(base_url=config.OLLAMA_API_BASE_URL, verbose=self.verbose)
-                
+        client_kwargs = {}
+        base_url_setting = _CLIENT_BASE_URL_SETTINGS.get(config.COMPLETIONS_API)
+        if base_url_setting:
+            if hasattr(config, base_url_setting):
+                client_kwargs['base_url'] = getattr(config, base_url_setting)
             else:
-                print("No OLLAMA_API_BASE_URL found in config.py, using default")
-                self.client = OllamaClient(verbose=self.verbose)
-        else:
-            raise ValueError("Unsupported completion API service configured")
+                print(f"No {base_url_setting} found in config.py, using default")
+
+        self.client = client_class(verbose=self.verbose, **client_kwargs)
+        _CLIENT_CACHE[cache_key] = self.client
     
+    def _report_completion_error(self, error):
+        """Print a completion error, with the full traceback only in verbose mode."""
+        if self.verbose:
+            import traceback
+            traceback.print_exception(type(error), error, error.__traceback__)
+        else:
+            print(f"An error occurred while getting completion: {error}")
+
     def get_completion(self, messages, model, **kwargs):
         """Get completion from the selected AI client and return the entire response.
 
@@ -84,23 +198,19 @@ class CompletionManager:
         """
         try:
             # Make sure the token count is within the limit
-            #messages = maintain_token_limit(messages, config.MAX_TOKENS)
+            #messages = maintain_token_limit(messages, _MAX_TOKENS)
             
             completion_stream = self.client.stream_completion(messages, model, **kwargs)
             
             # Accumulate the entire response
-            full_response = ""
+            response_parts = []
             for chunk in completion_stream:
-                full_response += chunk
+                response_parts.append(chunk)
 
-            return full_response
+            return "".join(response_parts)
 
         except Exception as e:
-            if self.verbose:
-                import traceback
-                traceback.print_exc()
-            else:
-                print(f"An error occurred while getting completion: {e}")
+            self._report_completion_error(e)
             return None
         
     def get_completion_stream(self, messages, model, **kwargs):
@@ -117,20 +227,85 @@ class CompletionManager:
         """
         try:
             # Make sure the token count is within the limit
-            messages = maintain_token_limit(messages, config.MAX_TOKENS)
+            messages = maintain_token_limit(messages, _MAX_TOKENS)
             
             completion_stream = self.client.stream_completion(messages, model, **kwargs)
             return completion_stream
 
         except Exception as e:
-            if self.verbose:
-                import traceback
-                traceback.print_exc()
-            else:
-                print(f"An error occurred while getting completion: {e}")
+            self._report_completion_error(e)
             return None
         
-    def process_text_stream(self, text_stream, sentence_callback=None, marker_tuples=None):
+    def _astream_completion(self, messages, model, **kwargs):
+        """Returns an async iterator over the completion stream of the selected AI client.
+
+        Clients that provide astream_completion are used directly; otherwise the blocking
+        stream_completion generator is read from a worker thread so the event loop is never blocked.
+        """
+        if hasattr(self.client, 'astream_completion'):
+            return self.client.astream_completion(messages, model, **kwargs)
+        return _iterate_in_thread(self.client.stream_completion(messages, model, **kwargs))
+
+    async def aget_completion(self, messages, model, **kwargs):
+        """Async version of get_completion.
+
+        Args:
+            messages (list): List of messages.
+            model (str): Model for completion.
+            **kwargs: Additional keyword arguments.
+
+        Returns:
+            str: The complete response from the AI client, or None if an error occurs.
+        """
+        try:
+            completion_stream = self._astream_completion(messages, model, **kwargs)
+
+            # Accumulate the entire response
+            response_parts = []
+            async for chunk in completion_stream:
+                response_parts.append(chunk)
+
+            return "".join(response_parts)
+
+        except Exception as e:
+            self._report_completion_error(e)
+            return None
+
+    async def aget_completions(self, batch):
+        """Get several completions concurrently over the shared client.
+
+        Args:
+            batch (list): List of (messages, model, kwargs) tuples, one per completion.
+
+        Returns:
+            list: The complete responses in the same order as batch, with None for any that failed.
+        """
+        return await asyncio.gather(
+            *(self.aget_completion(messages, model, **kwargs) for messages, model, kwargs in batch)
+        )
+
+    def aget_completion_stream(self, messages, model, **kwargs):
+        """Async version of get_completion_stream, for use with aprocess_text_stream.
+
+        Args:
+            messages (list): List of messages.
+            model (str): Model for completion.
+            **kwargs: Additional keyword arguments.
+
+        Returns:
+            async iterator: Stream of text chunks generated by the AI client, or None if an error occurs.
+        """
+        try:
+            # Make sure the token count is within the limit
+            messages = maintain_token_limit(messages, _MAX_TOKENS)
+
+            return self._astream_completion(messages, model, **kwargs)
+
+        except Exception as e:
+            self._report_completion_error(e)
+            return None
+
+    def process_text_stream(self, text_stream, sentence_callback=None, marker_tuples=None, return_full_text=True):
         """
         This takes in a stream of text, it will search for text between the markers and pass it to the designated callback functions if provided.
         Text between markers will be removed from the stream before being passed to the sentence_callback function.
@@ -140,66 +315,35 @@ class CompletionManager:
             text_stream: An iterable providing chunks of text.
             sentence_callback: Optional callback function for sentences.
             marker_tuples: Optional list of tuples (start_marker, end_marker, callback_function).
+            return_full_text: Whether to keep and return the full input text. Pass False when only
+                the callbacks are needed to avoid holding the whole response in memory.
 
         Returns:
-            str: The full, unmodified input text.
+            str: The full, unmodified input text, or None if return_full_text is False.
         """
-        full_text = ""
-        buffer = ""
-        active_markers = []
-        sentence_pattern = re.compile(r'(.*?[.!?](?:\s|$)|\n)', re.DOTALL)
-
-        def process_active_markers():
-            nonlocal buffer
-            for i, (start, end, callback) in enumerate(active_markers):
-                if end in buffer:
-                    marked_text, _, rest = buffer.partition(end)
-                    if marked_text.strip():
-                        if callback:
-                            callback(marked_text)
-                        buffer = rest
-                        return i
-            return -1
-
-        def process_new_markers_or_sentences():
-            nonlocal buffer
-            if marker_tuples:
-                for start, end, callback in marker_tuples:
-                    if start in buffer:
-                        _, _, buffer = buffer.partition(start)
-                        active_markers.append((start, end, callback))
-                        return True
-            match = sentence_pattern.match(buffer)
-            if match:
-                sentence = match.group(1)
-                if sentence_callback and sentence.strip():
-                    sentence_callback(sentence.strip())
-                buffer = buffer[len(sentence):]
-                return True
-            return False
-
+        processor = _text_stream_processor(sentence_callback, marker_tuples, return_full_text)
+        next(processor)
         for chunk in text_stream:
-            full_text += chunk
-            buffer += chunk
-            
-            while buffer:
-                if active_markers:
-                    marker_index = process_active_markers()
-                    if marker_index >= 0:
-                        active_markers.pop(marker_index)
-                    else:
-                        break
-                else:
-                    if not process_new_markers_or_sentences():
-                        break
-
-        # Process any remaining buffer
-        while buffer:
-            if active_markers:
-                active_markers.pop(0)
-            else:
-                if sentence_callback and buffer.strip():
-                    sentence_callback(buffer.strip())
-                break
+            processor.send(chunk)
+        return _finish_text_stream_processor(processor)
 
-        return full_text
\ No newline at end of file
+    async def aprocess_text_stream(self, text_stream, sentence_callback=None, marker_tuples=None, return_full_text=True):
+        """
+        Async version of process_text_stream. Callbacks fire as soon as each sentence or marked section
+        arrives, so sentences can be handed to TTS while the rest of the response is still streaming.
+
+        Args:
+            text_stream: An async iterable providing chunks of text.
+            sentence_callback: Optional callback function for sentences.
+            marker_tuples: Optional list of tuples (start_marker, end_marker, callback_function).
+            return_full_text: Whether to keep and return the full input text. Pass False when only
+                the callbacks are needed to avoid holding the whole response in memory.
+
+        Returns:
+            str: The full, unmodified input text, or None if return_full_text is False.
+        """
+        processor = _text_stream_processor(sentence_callback, marker_tuples, return_full_text)
+        next(processor)
+        async for chunk in text_stream:
+            processor.send(chunk)
+        return _finish_text_stream_processor(processor)
@@ -1,4 +1,5 @@
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import os
 import re
@@ -19,6 +20,11 @@ class OllamaClient:
         self.base_url = base_url
         self.api_key = api_key if api_key else os.getenv('OLLAMA_API_KEY')
         self.verbose = verbose
+        # Keep a session so streamed requests reuse pooled keep-alive connections
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=100)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
 
     def stream_completion(self, messages, model, **kwargs):
         """
@@ -44,12 +50,14 @@ class OllamaClient:
         json_data = json.dumps(data)
         headers = {'Authorization': f'Bearer {self.api_key}'} if self.api_key else {}
         try:
-            with requests.post(url, data=json_data, stream=True, headers=headers) as response:
+            with self.session.post(url, data=json_data, stream=True, headers=headers) as response:
                 if response.status_code == 200:
-                    for chunk in response.iter_content(chunk_size=None):
-                        if chunk:
+                    # The response is newline-delimited JSON; a network chunk may hold several
+                    # objects or only part of one, so parse complete lines rather than raw chunks
+                    for line in response.iter_lines(chunk_size=None):
+                        if line:
                             # Parse the JSON response and extract the content
-                            response_data = json.loads(chunk)
+                            response_data = json.loads(line)
                             yield response_data['message']['content']
                 else:
                     if self.verbose:
@@ -1,6 +1,7 @@
 import re
 import clipboard
 import tiktoken
+import functools
 import io
 from PIL import Image, ImageGrab
 import base64
@@ -96,6 +97,19 @@ def _trim_messages(messages, max_tokens):
 
     return messages
 
+@functools.lru_cache(maxsize=None)
+def _get_encoding(model):
+    """Return the tiktoken encoding for the given model, loading it only once per model."""
+    return tiktoken.encoding_for_model(model)
+
+@functools.lru_cache(maxsize=4096)
+def _count_text_tokens(text, model):
+    """
+    Count the tokens in a single string. Results are cached by content, since the earlier
+    turns of a conversation are counted again every time a new message is sent.
+    """
+    return len(_get_encoding(model).encode(text))
+
 def _count_tokens(messages, model="gpt-3.5-turbo"):
     """
     Count the tokens in the given messages using the specified model.
@@ -107,21 +121,20 @@ def _count_tokens(messages, model="gpt-3.5-turbo"):
     Returns:
     int: The total count of tokens in the messages.
     """
-    enc = tiktoken.encoding_for_model(model)
     msg_token_count = 0
     for message in messages:
         for key, value in message.items():
             if isinstance(value, str):
-                msg_token_count += len(enc.encode(value))
+                msg_token_count += _count_text_tokens(value, model)
             elif isinstance(value, list):
                 for item in value:
                     if isinstance(item, dict):
                         if item.get('type') == 'image':
                             msg_token_count += 85  # Approximate token count for an image
                         elif item.get('type') == 'text':
-                            msg_token_count += len(enc.encode(item.get('text', '')))
+                            msg_token_count += _count_text_tokens(item.get('text', ''), model)
                     elif isinstance(item, str):
-                        msg_token_count += len(enc.encode(item))
+                        msg_token_count += _count_text_tokens(item, model)
 
     return msg_token_count
 